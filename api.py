@@ -7,15 +7,65 @@ Handles file uploads and returns structured extracted data
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import aiofiles
+import asyncio
+import hashlib
+import orjson
 import os
-import tempfile
 import shutil
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
 import logging
 import math
 
+from tds_challan_extractor import (
+    extract_document,
+    extract_zip,
+    get_file_type,
+    create_extraction_pool,
+    make_scratch_dir,
+    sweep_scratch_dirs,
+    SUPPORTED_FORMATS
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# A few web workers for request parallelism; each one's pool handles the
+# files inside a request (ZIP members, multi-file uploads) in parallel
+DEFAULT_WEB_WORKERS = 2
+
+def web_workers():
+    """Number of server worker processes sharing this machine"""
+    # gunicorn.conf.py exports its actual worker count (including -w);
+    # with uvicorn alone, set WEB_CONCURRENCY instead of --workers
+    return max(1, int(os.environ.get("WEB_CONCURRENCY", DEFAULT_WEB_WORKERS)))
+
+# Per-worker process pool for extraction; OCR runs only inside it
+extraction_pool = None
+
+def new_extraction_pool():
+    """Create this web worker's share of the extraction pool"""
+    # The cores are divided between the web workers' pools, and each pool
+    # process gets cpu // pool size Paddle threads. One busy web worker can
+    # use the whole machine; when all are saturated the CPU is shared
+    # web_workers() ways, which is the accepted oversubscription.
+    return create_extraction_pool(max(1, (os.cpu_count() or 1) // web_workers()))
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson (FastAPI's own is deprecated)"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
 def clean_json_data(data):
     """Recursively replace NaN and Infinity with None/String for JSON compliance"""
     if isinstance(data, list):
@@ -35,25 +85,193 @@ def safe_delete(path):
     except Exception as e:
         logger.warning(f"Could not delete temp file {path}: {e}")
 
-from tds_challan_extractor import (
-    extract_document,
-    extract_zip,
-    get_file_type,
-    SUPPORTED_FORMATS
-)
+# Uploads are copied to disk in fixed-size chunks instead of being read whole
+UPLOAD_CHUNK_SIZE = 1 << 16  # 64 KiB
+
+async def save_upload_to_temp(file: UploadFile, suffix: str) -> Tuple[str, str]:
+    """Stream an uploaded file to a named temp file, returning (path, content hash)"""
+    digest = hashlib.blake2b(digest_size=16)
+    # aiofiles keeps the event loop free while the copy runs
+    async with aiofiles.tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await tmp_file.write(chunk)
+            digest.update(chunk)
+        return tmp_file.name, digest.hexdigest()
+
+# Extracted documents keyed by (file extension, upload content hash), shared
+# across requests within a worker process (least recently used entries are
+# evicted first). The extension picks the extractor, so it is part of the key.
+# Entries are bounded both in number and in total JSON size.
+EXTRACTION_CACHE_SIZE = 512
+EXTRACTION_CACHE_BYTES = 128 << 20  # 128 MiB per web worker
+_extraction_cache: "OrderedDict[Tuple[str, str], Tuple[List[Dict[str, Any]], int]]" = OrderedDict()
+_extraction_cache_bytes = 0
+
+def get_cached_documents(cache_key: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+    """Return previously extracted documents for identical upload content"""
+    entry = _extraction_cache.get(cache_key)
+    if entry is None:
+        return None
+    _extraction_cache.move_to_end(cache_key)
+    return entry[0]
+
+def is_cacheable(document: Dict[str, Any]) -> bool:
+    """Extractors report errors as no pages (or no OCR engine), not a failed status"""
+    if document.get("status") == "failed" or not document.get("pages"):
+        return False
+    return all(page.get("text") != "OCR unavailable" for page in document["pages"])
+
+def cache_documents(cache_key: Tuple[str, str], documents: List[Dict[str, Any]]):
+    """Remember extracted documents unless any of them failed or they are too large"""
+    global _extraction_cache_bytes
+    if not documents or not all(is_cacheable(doc) for doc in documents):
+        return
+    # Serialized size stands in for memory use (large workbooks, long OCR text)
+    size = len(orjson.dumps(documents, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+    if size > EXTRACTION_CACHE_BYTES:
+        return
+    previous = _extraction_cache.pop(cache_key, None)
+    if previous is not None:
+        _extraction_cache_bytes -= previous[1]
+    _extraction_cache[cache_key] = (documents, size)
+    _extraction_cache_bytes += size
+    while len(_extraction_cache) > EXTRACTION_CACHE_SIZE or _extraction_cache_bytes > EXTRACTION_CACHE_BYTES:
+        _, (_, evicted_size) = _extraction_cache.popitem(last=False)
+        _extraction_cache_bytes -= evicted_size
+
+def restart_extraction_pool(broken_pool):
+    """Replace the extraction pool after a worker died (e.g. killed for OOM during OCR)"""
+    global extraction_pool
+    # Concurrent failures all report the same broken pool; replace it only once
+    if extraction_pool is broken_pool:
+        logger.warning("⚠️ Extraction pool is broken, starting a new one")
+        broken_pool.shutdown(wait=False)
+        extraction_pool = new_extraction_pool()
+
+def submit_to_pool(func, *args):
+    """Submit func to the shared process pool; returns (pool, concurrent future)"""
+    pool = extraction_pool
+    try:
+        return pool, pool.submit(func, *args)
+    except BrokenProcessPool:
+        restart_extraction_pool(pool)
+        raise
+
+async def await_pool_future(pool, future):
+    """Wait for a pool job, recreating the pool if it broke"""
+    try:
+        return await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        restart_extraction_pool(pool)
+        raise
+
+async def run_in_extraction_pool(func, *args):
+    """Run func in the shared process pool, recreating the pool if it broke"""
+    return await await_pool_future(*submit_to_pool(func, *args))
+
+async def extract_document_safe(file_path, submitted=None):
+    """
+    Run extract_document in the shared process pool, returning an error
+    dict on failure. The pool's future is appended to submitted, if given.
+    """
+    try:
+        pool, future = submit_to_pool(extract_document, file_path)
+        if submitted is not None:
+            submitted.append(future)
+        return await await_pool_future(pool, future)
+    except Exception as e:
+        logger.error(f"Error processing {file_path}: {e}")
+        return {
+            "file_name": os.path.basename(file_path),
+            "error": str(e),
+            "status": "failed"
+        }
+
+def remove_dir(path):
+    """Remove a directory tree, logging instead of hiding failures"""
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove scratch dir {path}: {e}")
+
+def schedule_cleanup(path):
+    """Remove a scratch directory in the background, off the request path"""
+    asyncio.get_running_loop().run_in_executor(None, remove_dir, path)
+
+def cleanup_after(futures, path):
+    """Remove a scratch directory once the pool jobs reading from it have finished"""
+    loop = asyncio.get_running_loop()
+    scheduled = False
+    
+    def check():
+        # Runs on the event loop thread only, so no locking is needed
+        nonlocal scheduled
+        if not scheduled and all(f.done() for f in futures):
+            scheduled = True
+            schedule_cleanup(path)
+    
+    for future in futures:
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(check))
+    check()
+
+def stream_zip_documents(file_name, extracted_files, extract_dir):
+    """
+    Stream ZIP extraction results as one JSON object.
+    
+    Documents are written out in completion order as each file finishes,
+    so nothing is buffered; total_documents follows the documents array.
+    """
+    async def generate():
+        submitted = []  # pool futures, to cancel or wait for on the way out
+        tasks = [asyncio.ensure_future(extract_document_safe(p, submitted)) for p in extracted_files]
+        total = 0
+        try:
+            yield (
+                '{"status": "success", '
+                f'"file_name": {orjson.dumps(file_name).decode()}, '
+                '"file_type": "zip", "documents": ['
+            )
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if not result:
+                    continue
+                yield (b"," if total else b"") + orjson.dumps(clean_json_data(result))
+                total += 1
+            yield f'], "total_documents": {total}}}'
+        finally:
+            # Client went away or we're done: drop jobs that haven't started,
+            # and remove the extracted files once the running ones finish
+            for task in tasks:
+                task.cancel()
+            for future in submitted:
+                future.cancel()
+            cleanup_after(submitted, extract_dir)
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the extraction pool and clear stale scratch dirs; stop the pool on shutdown"""
+    global extraction_pool
+    extraction_pool = new_extraction_pool()
+    # Scratch directories left by earlier runs (crashes, killed workers)
+    await run_in_threadpool(sweep_scratch_dirs)
+    try:
+        yield
+    finally:
+        extraction_pool.shutdown(wait=False)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="TDS Document Extraction API",
     description="Extract structured data from TDS documents (PDF, DOCX, Excel, Images)",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -108,56 +326,39 @@ async def upload_file(file: UploadFile = File(...)):
                 detail=f"Unsupported file format. Supported: {', '.join(SUPPORTED_FORMATS)}, .zip"
             )
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            # Write uploaded file to temp location
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        # Stream uploaded file to a temp location
+        tmp_path, content_hash = await save_upload_to_temp(file, file_ext)
         
         try:
             # Process based on file type
             if file_ext == '.zip':
-                # Extract zip and process all files
-                extracted_files = extract_zip(tmp_path, out_dir="temp_extracted")
+                # Extract into a per-request directory so concurrent uploads don't collide;
+                # it is removed once the streamed response has finished
+                extract_dir = make_scratch_dir()
+                extracted_files = await run_in_threadpool(
+                    extract_zip, tmp_path, out_dir=extract_dir
+                )
                 
                 if not extracted_files:
+                    schedule_cleanup(extract_dir)
                     raise HTTPException(
                         status_code=400,
                         detail="No supported files found in ZIP archive"
                     )
                 
-                results = []
-                for file_path in extracted_files:
-                    try:
-                        result = extract_document(file_path)
-                        if result:
-                            results.append(result)
-                    except Exception as e:
-                        logger.error(f"Error processing {file_path}: {e}")
-                        results.append({
-                            "file_name": os.path.basename(file_path),
-                            "error": str(e),
-                            "status": "failed"
-                        })
-                
-                # Cleanup extracted files
-                if os.path.exists("temp_extracted"):
-                    shutil.rmtree("temp_extracted", ignore_errors=True)
-                
-
-                
-                return JSONResponse(content=clean_json_data({
-                    "status": "success",
-                    "file_name": file.filename,
-                    "file_type": "zip",
-                    "total_documents": len(results),
-                    "documents": results
-                }))
+                return stream_zip_documents(file.filename, extracted_files, extract_dir)
+            
+            cache_key = (file_ext, content_hash)
+            documents = get_cached_documents(cache_key)
+            if documents is not None:
+                logger.info(f"♻️ Reusing extraction for identical upload: {file.filename}")
             
             else:
                 # Process single file
-                result = extract_document(tmp_path)
+                # Paddle predictors and Ghostscript aren't thread-safe, so
+                # extraction always runs in a pool worker process (scanned
+                # pages are OCR'd in order there; only the CLI splits pages)
+                result = await run_in_extraction_pool(extract_document, tmp_path)
                 
                 if not result:
                     raise HTTPException(
@@ -165,15 +366,16 @@ async def upload_file(file: UploadFile = File(...)):
                         detail="Failed to extract data from document"
                     )
                 
-
-                
-                return JSONResponse(content=clean_json_data({
-                    "status": "success",
-                    "file_name": file.filename,
-                    "file_type": get_file_type(tmp_path),
-                    "total_documents": 1,
-                    "documents": [result]
-                }))
+                documents = [result]
+                cache_documents(cache_key, documents)
+            
+            return ORJSONResponse(content=clean_json_data({
+                "status": "success",
+                "file_name": file.filename,
+                "file_type": get_file_type(tmp_path),
+                "total_documents": len(documents),
+                "documents": documents
+            }))
         
         finally:
             # Cleanup temp file
@@ -190,6 +392,44 @@ async def upload_file(file: UploadFile = File(...)):
         )
 
 
+def failed_result(file_name, error):
+    """Result entry for a file that could not be processed"""
+    logger.error(f"Error processing {file_name}: {error}")
+    return {
+        "file_name": file_name,
+        "error": str(error),
+        "status": "failed"
+    }
+
+
+async def process_uploaded_file(file: UploadFile) -> Dict[str, Any]:
+    """Save one file of a multi-file upload and extract it"""
+    file_ext = Path(file.filename).suffix.lower()
+    
+    if file_ext not in SUPPORTED_FORMATS:
+        return {
+            "file_name": file.filename,
+            "error": f"Unsupported format: {file_ext}",
+            "status": "skipped"
+        }
+    
+    # Stream uploaded file to a temp location
+    tmp_path, content_hash = await save_upload_to_temp(file, file_ext)
+    
+    try:
+        cache_key = (file_ext, content_hash)
+        cached = get_cached_documents(cache_key)
+        result = cached[0] if cached else await run_in_extraction_pool(extract_document, tmp_path)
+        if not result:
+            return failed_result(file.filename, "Extraction failed")
+        
+        cache_documents(cache_key, [result])
+        return result
+    finally:
+        if os.path.exists(tmp_path):
+            safe_delete(tmp_path)
+
+
 @app.post("/api/upload-multiple")
 async def upload_multiple_files(files: List[UploadFile] = File(...)):
     """
@@ -202,51 +442,17 @@ async def upload_multiple_files(files: List[UploadFile] = File(...)):
         if not files:
             raise HTTPException(status_code=400, detail="No files provided")
         
-        results = []
-        
-        for file in files:
-            try:
-                file_ext = Path(file.filename).suffix.lower()
-                
-                if file_ext not in SUPPORTED_FORMATS:
-                    results.append({
-                        "file_name": file.filename,
-                        "error": f"Unsupported format: {file_ext}",
-                        "status": "skipped"
-                    })
-                    continue
-                
-                # Create temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-                    content = await file.read()
-                    tmp_file.write(content)
-                    tmp_path = tmp_file.name
-                
-                try:
-                    result = extract_document(tmp_path)
-                    if result:
-                        results.append(result)
-                    else:
-                        results.append({
-                            "file_name": file.filename,
-                            "error": "Extraction failed",
-                            "status": "failed"
-                        })
-                finally:
-                    if os.path.exists(tmp_path):
-                        safe_delete(tmp_path)
-            
-            except Exception as e:
-                logger.error(f"Error processing {file.filename}: {e}")
-                results.append({
-                    "file_name": file.filename,
-                    "error": str(e),
-                    "status": "failed"
-                })
-        
-
+        # Every file is saved and extracted concurrently; results keep upload order
+        results = await asyncio.gather(
+            *(process_uploaded_file(file) for file in files),
+            return_exceptions=True
+        )
+        results = [
+            failed_result(file.filename, r) if isinstance(r, Exception) else r
+            for file, r in zip(files, results)
+        ]
         
-        return JSONResponse(content=clean_json_data({
+        return ORJSONResponse(content=clean_json_data({
             "status": "success",
             "total_files": len(files),
             "total_processed": len([r for r in results if "pages" in r]),
@@ -270,9 +476,12 @@ if __name__ == "__main__":
     logger.info("📄 API Documentation: http://localhost:8000/docs")
     logger.info("🌐 Frontend: http://localhost:8000")
     
+    # Multiple workers need the app as an import string.
+    # On Linux/macOS prefer: gunicorn -c gunicorn.conf.py api:app
     uvicorn.run(
-        app,
+        "api:app",
         host="0.0.0.0",
         port=8000,
+        workers=web_workers(),
         log_level="info"
     )
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for the TDS Document Extraction API
+
+Usage (Linux/macOS):
+    gunicorn -c gunicorn.conf.py api:app
+
+Each worker is a separate process with its own event loop and its own
+extraction process pool; workers share no state. The cores are divided
+between the workers' pools, and PaddleOCR is only built inside them.
+"""
+
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# A few workers for request-level parallelism; each worker's pool
+# (cpu_count // workers processes) handles the files within a request
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# OCR on large scanned PDFs is slow
+timeout = 300
+
+preload_app = True
+
+
+def on_starting(server):
+    """Tell the app the real worker count (also when set with -w) so it can size its pools"""
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
@@ -6,13 +6,26 @@ Fixes PermissionError with temp files
 
 import zipfile
 import os
+import datetime
+import concurrent.futures
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+import functools
+import hashlib
+import itertools
+import operator
+import re
+import statistics
+import sys
+from collections import deque
 import shutil
-import json
+import orjson
 import fitz  # PyMuPDF
 import camelot
 import pandas as pd
+import numpy as np
 from paddleocr import PaddleOCR
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from pathlib import Path
 import docx
 import logging
@@ -20,6 +33,14 @@ import tempfile
 import time
 from typing import List, Dict, Any
 import openpyxl
+from openpyxl.styles.numbers import BUILTIN_FORMATS
+import xml.etree.ElementTree as ET
+
+# Rust-backed Excel reader; openpyxl is used when it isn't installed
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
 
 # ---------- WINDOWS-SAFE LOGGING ----------
 logging.basicConfig(
@@ -29,84 +50,451 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ---------- OCR ENGINE ----------
-try:
-    ocr_engine = PaddleOCR(use_textline_orientation=True, lang="en")
-    logger.info("✅ PaddleOCR initialized")
-except Exception as e:
-    logger.warning(f"⚠️ PaddleOCR init failed: {e}")
-    ocr_engine = None
+# Created lazily so each worker process pays the PaddleOCR constructor once
+ocr_engine = None
+_ocr_initialized = False
+
+OCR_CPU_THREADS = max(1, (os.cpu_count() or 1) // 2)
+# Pages whose median recognition confidence falls below this are re-run
+# with the angle classifier
+OCR_CLS_RETRY_CONFIDENCE = 0.6
+
+def _paddle_has_gpu():
+    """Check whether Paddle was built with CUDA and can see a device"""
+    try:
+        import paddle
+        return paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0
+    except Exception:
+        return False
+
+def init_ocr_engine(cpu_threads=OCR_CPU_THREADS):
+    """Initialize the per-process OCR engine (also used as pool initializer)"""
+    global ocr_engine, _ocr_initialized
+    if _ocr_initialized:
+        return ocr_engine
+    _ocr_initialized = True
+    try:
+        # The angle classifier is loaded for the low-confidence fallback,
+        # but ocr() calls skip it by default
+        ocr_engine = PaddleOCR(
+            use_angle_cls=True,
+            lang="en",
+            use_gpu=_paddle_has_gpu(),
+            enable_mkldnn=True,
+            cpu_threads=cpu_threads
+        )
+        logger.info("✅ PaddleOCR initialized")
+    except Exception as e:
+        logger.warning(f"⚠️ PaddleOCR init failed: {e}")
+        ocr_engine = None
+    return ocr_engine
+
+# ---------- PARALLELISM ----------
+EXTRACTION_WORKERS = os.cpu_count() or 1
+
+def create_extraction_pool(max_workers=EXTRACTION_WORKERS, cpu_threads=None):
+    """Process pool for CPU-bound per-file extraction"""
+    # Split the cores between workers so Paddle doesn't oversubscribe them
+    if cpu_threads is None:
+        cpu_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    # Spawned, not forked: the parent may already have started OpenMP/MKL
+    # threads, and every worker must build its own PaddleOCR engine
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_ocr_engine,
+        initargs=(cpu_threads,)
+    )
 
 # ---------- SUPPORTED FORMATS ----------
 SUPPORTED_FORMATS = {'.pdf', '.docx', '.doc', '.xlsx', '.xls', '.png', '.jpg', '.jpeg', '.bmp', '.tiff'}
 
-def safe_rmtree(path, retries=5, delay=0.5):
-    """Windows-safe directory deletion with retries"""
-    for attempt in range(retries):
+# ---------- SCRATCH DIRECTORIES ----------
+# Each ZIP gets its own directory, so nothing has to be deleted up front and
+# concurrent extractions never contend. Leftovers are swept on startup.
+# Directory names carry the creating process's PID (smartaudit_<pid>_xxxx),
+# so a restarting worker never removes a directory another worker is using.
+SCRATCH_DIR = tempfile.gettempdir()
+SCRATCH_PREFIX = "smartaudit_"
+SCRATCH_MAX_AGE = 60 * 60  # seconds, for directories without an owner PID
+
+def make_scratch_dir():
+    """Create a unique scratch directory for one extraction"""
+    return tempfile.mkdtemp(prefix=f"{SCRATCH_PREFIX}{os.getpid()}_", dir=SCRATCH_DIR)
+
+def _pid_alive(pid):
+    """Check whether a process with this PID is still running"""
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
         try:
-            if os.path.exists(path):
-                shutil.rmtree(path)
-            return True
-        except Exception as e:
-            logger.warning(f"Delete attempt {attempt+1} failed: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-    logger.error(f"❌ Failed to delete {path} after {retries} attempts")
-    return False
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        finally:
+            kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
 
-def extract_zip(zip_path, out_dir="extracted_files"):
-    """Extract zip with safe cleanup"""
-    safe_rmtree(out_dir)
-    os.makedirs(out_dir)
+def _scratch_owner(name):
+    """PID encoded in a scratch directory name, or None"""
+    pid = name[len(SCRATCH_PREFIX):].split("_", 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+def sweep_scratch_dirs(max_age=SCRATCH_MAX_AGE):
+    """Remove scratch directories whose owning process has exited"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        with os.scandir(SCRATCH_DIR) as entries:
+            for entry in entries:
+                if not entry.name.startswith(SCRATCH_PREFIX):
+                    continue
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    owner = _scratch_owner(entry.name)
+                    if owner is None:
+                        # Unowned (older naming): fall back to its age
+                        stale = entry.stat().st_mtime < cutoff
+                    else:
+                        stale = owner != os.getpid() and not _pid_alive(owner)
+                    if stale:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                except OSError:
+                    pass
+    except OSError as e:
+        logger.warning(f"⚠️ Scratch sweep failed: {e}")
+    if removed:
+        logger.info(f"🧹 Removed {removed} stale scratch directories")
+    return removed
+
+def extract_zip(zip_path, out_dir=None):
+    """Extract supported files from a zip into out_dir (a new scratch directory by default)"""
+    if out_dir is None:
+        out_dir = make_scratch_dir()
+    else:
+        os.makedirs(out_dir, exist_ok=True)
     
+    # Filter and extract in one pass; unsupported entries never touch disk
+    all_files = []
     try:
         with zipfile.ZipFile(zip_path, "r") as z:
-            z.extractall(out_dir)
+            for info in z.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                if Path(info.filename).suffix.lower() in SUPPORTED_FORMATS:
+                    all_files.append(z.extract(info, out_dir))
         logger.info(f"✅ Extracted zip: {zip_path}")
     except Exception as e:
         logger.error(f"❌ Failed to extract zip: {e}")
         return []
     
-    # Find supported files
-    all_files = []
-    for root, dirs, files in os.walk(out_dir):
-        for file in files:
-            if Path(file).suffix.lower() in SUPPORTED_FORMATS:
-                all_files.append(os.path.join(root, file))
-    
     return all_files
 
-def is_digital_pdf(pdf_path):
-    """Check if PDF is digital"""
+# Digital-PDF detection stops as soon as the first pages settle the question
+DIGITAL_PROBE_PAGES = 3
+DIGITAL_PROBE_CHARS = 500
+DIGITAL_MIN_BLOCKS = 20
+
+def _detect_digital(doc):
+    """Check if an open PDF is digital"""
     try:
-        doc = fitz.open(pdf_path)
+        # Cheap proxy: plenty of extractable text on the first pages
+        probe_chars = sum(len(p.get_text()) for p in itertools.islice(doc, DIGITAL_PROBE_PAGES))
+        if probe_chars > DIGITAL_PROBE_CHARS:
+            return True
+        
         text_blocks = 0
         total_blocks = 0
         
-        for page in doc:
+        for page_count, page in enumerate(doc, start=1):
             blocks = page.get_text("blocks")
             for block in blocks:
                 if block[6] == 0:
                     total_blocks += 1
                     if block[4].strip():
                         text_blocks += 1
+            
+            # Enough blocks seen to decide either way
+            if total_blocks >= DIGITAL_MIN_BLOCKS:
+                return text_blocks > (total_blocks * 0.3)
+            # No text at all across the probe pages: scanned
+            if page_count >= DIGITAL_PROBE_PAGES and text_blocks == 0:
+                return False
         
-        doc.close()
         return text_blocks > (total_blocks * 0.3)
     except Exception:
         return False
 
-def safe_cleanup(temp_files):
-    """Safely delete temp files with retries"""
-    for file_path in temp_files:
-        for attempt in range(3):
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                break
-            except Exception as e:
-                if attempt == 2:
-                    logger.warning(f"Failed to delete {file_path}: {e}")
-                time.sleep(0.1)
+def is_digital_pdf(pdf_path):
+    """Check if PDF is digital"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return _detect_digital(doc)
+    except Exception:
+        return False
+
+def _page_pixels(page, dpi):
+    """Render a PDF page and view its samples as an (h, w, n) array"""
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+
+def render_page_array(page, dpi):
+    """Render a PDF page to a BGR numpy array for PaddleOCR (no temp PNG)"""
+    img = _page_pixels(page, dpi)
+    if img.shape[2] == 1:
+        return np.repeat(img, 3, axis=2)
+    # PyMuPDF renders RGB, PaddleOCR expects OpenCV-style BGR
+    return np.ascontiguousarray(img[:, :, ::-1])
+
+def render_page_shared(page, dpi):
+    """Render a PDF page as BGR straight into a new shared-memory block; returns (shm, shape)"""
+    img = _page_pixels(page, dpi)
+    shape = (img.shape[0], img.shape[1], 3)
+    shm = shared_memory.SharedMemory(create=True, size=img.shape[0] * img.shape[1] * 3)
+    out = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    # Grayscale broadcasts across the three channels
+    out[:] = img[:, :, ::-1] if img.shape[2] == 3 else img
+    del out
+    return shm, shape
+
+def _attach_shared(shm_name):
+    """Attach to a block owned by the parent without tracking it here"""
+    # A tracked attach makes the worker's resource tracker report the block
+    # as leaked (or unlink it) after the parent already freed it. Before
+    # 3.13 that means briefly stubbing out the module-level register(),
+    # which is only safe because pool workers run one task at a time on a
+    # single thread; don't call this from a multi-threaded process.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=shm_name)
+    finally:
+        resource_tracker.register = register
+
+def _ocr_shared_page(shm_name, shape, cls):
+    """Pool task: OCR a page image that the parent left in shared memory"""
+    engine = init_ocr_engine()
+    if not engine:
+        return ["OCR unavailable"]
+    shm = _attach_shared(shm_name)
+    try:
+        img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        lines, _ = ocr_lines(engine, img, cls)
+        # The array must drop its buffer export before the block can close
+        del img
+        return lines
+    finally:
+        shm.close()
+
+def _release_shared(shm):
+    """Close and free a shared-memory block owned by this process"""
+    shm.close()
+    shm.unlink()
+
+def choose_scan_dpi(page):
+    """Use 200 DPI unless that would leave the page under ~2000px wide"""
+    return 200 if page.rect.width * 200 / 72 < 2000 else 300
+
+# Adaptive scan DPI: render so detected text lines are ~30 px tall
+SCAN_PROBE_DPI = 72
+SCAN_TARGET_TEXT_PX = 30
+SCAN_MIN_DPI = 150
+SCAN_MAX_DPI = 400
+
+def estimate_scan_dpi(engine, page):
+    """Pick a render DPI from text-box heights on a cheap thumbnail (None if no text found)"""
+    thumb = render_page_array(page, SCAN_PROBE_DPI)
+    # Detection only: boxes come back as four [x, y] corner points
+    result = engine.ocr(thumb, rec=False, cls=False)
+    boxes = result[0] if result and result[0] else []
+    if not boxes:
+        return None
+    
+    text_px = statistics.median(max(p[1] for p in box) - min(p[1] for p in box) for box in boxes)
+    target_dpi = int(SCAN_PROBE_DPI * SCAN_TARGET_TEXT_PX / max(text_px, 6))
+    return min(max(target_dpi, SCAN_MIN_DPI), SCAN_MAX_DPI)
+
+def _ocr_raw(engine, img, cls):
+    """Run OCR and return the raw [box, (text, confidence)] lines"""
+    ocr_result = engine.ocr(img, cls=cls)
+    return ocr_result[0] if ocr_result and ocr_result[0] else []
+
+def ocr_lines(engine, img, cls=None):
+    """
+    Run OCR on an image path or array.
+    
+    With cls=None the angle classifier is only used when confidence is low
+    without it. Returns (recognized lines, whether the classifier was used,
+    or None if nothing was recognized yet).
+    """
+    raw = _ocr_raw(engine, img, cls=bool(cls))
+    # An empty result leaves the decision open for the next image
+    if cls is None and raw:
+        cls = statistics.median(line[1][1] for line in raw) < OCR_CLS_RETRY_CONFIDENCE
+        if cls:
+            raw = _ocr_raw(engine, img, cls=True)
+    return [line[1][0] for line in raw], cls
+
+def table_to_rows(table):
+    """Convert a Camelot table to a list of string rows"""
+    # Camelot cells are already strings; tolist() builds the rows in C
+    return table.df.fillna("").values.tolist()
+
+def file_digest(path):
+    """Content hash of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.digest()
+
+# Camelot results keyed by (PDF content hash, flavor, pages), least recently
+# used evicted first. Uploads and ZIP members all get fresh temp paths, so
+# the key follows content: the same PDF sent again skips Ghostscript.
+CAMELOT_CACHE_SIZE = 16
+_camelot_cache = OrderedDict()
+
+def _read_camelot(pdf_path, content_key, flavor, pages="all"):
+    """Run Camelot once per (document content, flavor, pages); returns (page_no, rows) pairs"""
+    key = (content_key, flavor, pages)
+    tables = _camelot_cache.get(key)
+    if tables is None:
+        try:
+            camelot_tables = camelot.read_pdf(
+                pdf_path,
+                pages=pages,
+                flavor=flavor,
+                suppress_stdout=True,
+                strip_text="\n"
+            )
+            # Stored as tuples so no caller can change the cached rows
+            tables = tuple((int(t.page), tuple(map(tuple, table_to_rows(t)))) for t in camelot_tables)
+        except Exception:
+            return []
+        _camelot_cache[key] = tables
+        while len(_camelot_cache) > CAMELOT_CACHE_SIZE:
+            _camelot_cache.popitem(last=False)
+    else:
+        _camelot_cache.move_to_end(key)
+    return [(page_no, [list(row) for row in rows]) for page_no, rows in tables]
+
+def camelot_tables_by_page(pdf_path, page_numbers, stream_pages=None):
+    """
+    Lattice tables for the given pages, using stream only for pages lattice missed.
+    
+    stream_pages optionally restricts the stream fallback further.
+    """
+    content_key = file_digest(pdf_path)
+    lattice_pages = sorted(set(page_numbers))
+    
+    tables_by_page = defaultdict(list)
+    if lattice_pages:
+        for page_no, rows in _read_camelot(pdf_path, content_key, "lattice", ",".join(map(str, lattice_pages))):
+            tables_by_page[page_no].append(rows)
+    
+    fallback = lattice_pages if stream_pages is None else sorted(set(stream_pages))
+    missing = [str(p) for p in fallback if p not in tables_by_page]
+    if missing:
+        for page_no, rows in _read_camelot(pdf_path, content_key, "stream", ",".join(missing)):
+            tables_by_page[page_no].append(rows)
+    
+    return tables_by_page
+
+# ---------- TABLE PAGE DETECTION ----------
+# Ruling needed before a page is worth a Camelot lattice pass
+TABLE_MIN_HLINES = 4
+TABLE_MIN_VLINES = 2
+# Aligned text needed before a page is worth a Camelot stream pass
+TABLE_MIN_COLUMNS = 3
+TABLE_MIN_ROWS = 3
+# Words on one line split into cells where the gap exceeds TABLE_CELL_GAP;
+# positions are compared in TABLE_X_BUCKET / TABLE_ROW_BUCKET point steps
+TABLE_CELL_GAP = 10
+TABLE_X_BUCKET = 4
+TABLE_ROW_BUCKET = 3
+
+def _ruled_line_counts(page):
+    """Count horizontal and vertical ruling lines drawn on a page"""
+    hlines = vlines = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1:
+                    hlines += 1
+                elif abs(p1.x - p2.x) < 1:
+                    vlines += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height < 2:
+                    hlines += 1
+                elif rect.width < 2:
+                    vlines += 1
+                else:
+                    # Cell borders drawn as boxes
+                    hlines += 2
+                    vlines += 2
+    return hlines, vlines
+
+def _row_cell_starts(page):
+    """Split each visual line into gap-separated cells; yield the cells' left edges"""
+    rows = defaultdict(list)
+    for x0, y0, x1, y1, *_ in page.get_text("words"):
+        rows[round((y0 + y1) / 2 / TABLE_ROW_BUCKET)].append((x0, x1))
+    for words in rows.values():
+        words.sort()
+        starts = {round(words[0][0] / TABLE_X_BUCKET)}
+        right = words[0][1]
+        for x0, x1 in words[1:]:
+            if x0 - right > TABLE_CELL_GAP:
+                starts.add(round(x0 / TABLE_X_BUCKET))
+            right = max(right, x1)
+        yield starts
+
+def _has_text_columns(page):
+    """Check for several lines that break into cells at the same x positions"""
+    rows = list(_row_cell_starts(page))
+    if len(rows) < TABLE_MIN_ROWS:
+        return False
+    # Most lines start at the page margin; that alone is not a column
+    margin = Counter(min(starts) for starts in rows).most_common(1)[0][0]
+    rows = [starts - {margin - 1, margin, margin + 1} for starts in rows]
+    shared = {x for x, n in Counter(x for starts in rows for x in starts).items() if n >= TABLE_MIN_ROWS}
+    # Rows that hit the same inner column positions, i.e. real table rows
+    aligned = sum(1 for starts in rows if len(starts & shared) >= TABLE_MIN_COLUMNS - 1)
+    return aligned >= TABLE_MIN_ROWS
+
+def find_table_pages(doc):
+    """Return (ruled pages for lattice, column-aligned pages for stream)"""
+    lattice_pages = []
+    stream_pages = []
+    for i, page in enumerate(doc, start=1):
+        try:
+            hlines, vlines = _ruled_line_counts(page)
+            if hlines >= TABLE_MIN_HLINES and vlines >= TABLE_MIN_VLINES:
+                lattice_pages.append(i)
+            if _has_text_columns(page):
+                stream_pages.append(i)
+        except Exception:
+            # Can't tell: let Camelot look at it
+            lattice_pages.append(i)
+            stream_pages.append(i)
+    return lattice_pages, stream_pages
 
 def extract_tables_with_fallback(file_path, file_type, page_num=None):
     """Extract tables"""
@@ -115,41 +503,23 @@ def extract_tables_with_fallback(file_path, file_type, page_num=None):
     if file_type == "pdf":
         try:
             if page_num:
-                camelot_tables = camelot.read_pdf(file_path, pages=str(page_num), flavor="lattice")
+                page_numbers = [page_num]
             else:
-                camelot_tables = camelot.read_pdf(file_path, pages="all", flavor="lattice")
+                with fitz.open(file_path) as doc:
+                    page_numbers = range(1, doc.page_count + 1)
             
-            for t in camelot_tables:
-                df = t.df.fillna("")
-                # Convert to strings to preserve formatting
-                table_data = [[str(cell) if cell != "" else "" for cell in row] for row in df.values.tolist()]
-                if table_data and len(table_data) > 1:
-                    tables.append(table_data)
+            tables_by_page = camelot_tables_by_page(file_path, page_numbers)
+            for page_no in sorted(tables_by_page):
+                tables.extend(t for t in tables_by_page[page_no] if len(t) > 1)
         except:
             pass
-        
-        if not tables:
-            try:
-                if page_num:
-                    camelot_tables = camelot.read_pdf(file_path, pages=str(page_num), flavor="stream")
-                else:
-                    camelot_tables = camelot.read_pdf(file_path, pages="all", flavor="stream")
-                
-                for t in camelot_tables:
-                    df = t.df.fillna("")
-                    # Convert to strings to preserve formatting
-                    table_data = [[str(cell) if cell != "" else "" for cell in row] for row in df.values.tolist()]
-                    if table_data and len(table_data) > 1:
-                        tables.append(table_data)
-            except:
-                pass
     
     elif file_type == "excel":
         try:
             df = pd.read_excel(file_path, sheet_name=0)
-            # Convert to strings to preserve formatting
+            # Convert to strings to preserve formatting (vectorized; blanks become "")
             header = [str(col) for col in df.columns.tolist()]
-            table_data = [[str(cell) if not pd.isna(cell) else "" for cell in row] for row in df.values.tolist()]
+            table_data = df.astype(object).where(df.notna(), "").astype(str).values.tolist()
             if table_data:
                 tables.append([header] + table_data)
         except:
@@ -157,76 +527,119 @@ def extract_tables_with_fallback(file_path, file_type, page_num=None):
     
     return tables
 
-def extract_digital_pdf(pdf_path):
-    """Extract digital PDF"""
+# Reading order: top-to-bottom, then left-to-right
+_BLOCK_ORDER = operator.itemgetter(1, 0)
+
+def page_block_text(page):
+    """Join a page's text blocks in reading order, dropping tiny fragments"""
+    blocks = page.get_text("blocks")
+    blocks.sort(key=_BLOCK_ORDER)
+    texts = (b[4].strip() for b in blocks if b[6] == 0)
+    return "\n\n".join(t for t in texts if len(t) > 2)
+
+def _extract_digital(doc, pdf_path):
+    """Extract an open digital PDF (Camelot reads pdf_path separately)"""
     try:
-        doc = fitz.open(pdf_path)
         pages_data = []
         
-        tables_by_page = defaultdict(list)
-        try:
-            camelot_tables = camelot.read_pdf(pdf_path, pages="all", flavor="lattice")
-            for t in camelot_tables:
-                df = t.df.fillna("")
-                # Convert to strings to preserve formatting
-                table_data = [[str(cell) if cell != "" else "" for cell in row] for row in df.values.tolist()]
-                tables_by_page[t.page].append(table_data)
-        except:
-            try:
-                camelot_tables = camelot.read_pdf(pdf_path, pages="all", flavor="stream")
-                for t in camelot_tables:
-                    df = t.df.fillna("")
-                    # Convert to strings to preserve formatting
-                    table_data = [[str(cell) if cell != "" else "" for cell in row] for row in df.values.tolist()]
-                    tables_by_page[t.page].append(table_data)
-            except:
-                pass
+        # Only run Camelot on pages that look like they hold tables
+        lattice_pages, stream_pages = find_table_pages(doc)
+        tables_by_page = camelot_tables_by_page(pdf_path, lattice_pages, stream_pages)
         
         for i, page in enumerate(doc, start=1):
-            blocks = page.get_text("blocks")
-            blocks = sorted(blocks, key=lambda b: (b[1], b[0]))
-            
-            text_parts = []
-            for block in blocks:
-                if block[6] == 0:
-                    text = block[4].strip()
-                    if len(text) > 2:
-                        text_parts.append(text)
-            
             pages_data.append({
                 "page_no": i,
-                "text": "\n\n".join(text_parts),
+                "text": page_block_text(page),
                 "tables": tables_by_page.get(i, [])
             })
         
-        doc.close()
         return pages_data
     except Exception as e:
         logger.error(f"❌ Digital PDF failed: {e}")
         return []
 
-def extract_scanned_pdf(pdf_path):
-    """Extract scanned PDF"""
+# Upper bound on rendered pages waiting in shared memory for the OCR pool
+SCAN_MAX_SHARED_PAGES = 2 * EXTRACTION_WORKERS
+
+def _extract_scanned(doc, page_pool=None):
+    """
+    Extract an open scanned PDF.
+    
+    With a page_pool, the first page is OCR'd here to settle DPI and the
+    angle classifier, and the remaining pages are OCR'd in the pool. They
+    are handed over through shared memory instead of being pickled.
+    Only the CLI (process_single_file) passes a page_pool; the API already
+    runs this inside a pool worker and parallelizes across files instead.
+    """
+    shared = deque()  # (future, shm) for pages still owned by the pool
     try:
-        doc = fitz.open(pdf_path)
         pages_data = []
-        temp_files = []
+        engine = init_ocr_engine()
+        # Decided on the first page, then reused for the rest of the document
+        use_cls = None
+        # Probed once per document; None (no text found, or the probe
+        # failed) falls back to choose_scan_dpi for every page
+        scan_dpi = None
+        dpi_probed = False
+        # Identical rendered pages (repeated footers, duplicated challans) are OCR'd once;
+        # values are text, or futures for pages sent to the pool
+        page_text_cache = {}
+        page_texts = []
         
+        # Pages are rendered straight to memory; nothing is written to disk.
+        # PaddleOCR 2.7 only accepts image lists with det=False, so each
+        # page still gets its own ocr() call.
         for i, page in enumerate(doc, start=1):
-            pix = page.get_pixmap(dpi=300)
-            img_path = f"temp_page_{i}_{int(time.time())}.png"
-            pix.save(img_path)
-            temp_files.append(img_path)
-            
             try:
-                if ocr_engine:
-                    ocr_result = ocr_engine.ocr(img_path, cls=True)
-                    lines = [line[1][0] for line in ocr_result[0]] if ocr_result and ocr_result[0] else []
-                    text = "\n".join(lines)
+                if engine:
+                    if not dpi_probed:
+                        dpi_probed = True
+                        try:
+                            scan_dpi = estimate_scan_dpi(engine, page)
+                        except Exception as e:
+                            logger.warning(f"⚠️ DPI probe failed, using default DPI: {e}")
+                    dpi = scan_dpi or choose_scan_dpi(page)
+                    
+                    if page_pool is not None and use_cls is not None:
+                        shm, shape = render_page_shared(page, dpi)
+                        page_hash = hashlib.blake2b(shm.buf[:shape[0] * shape[1] * 3], digest_size=16).digest()
+                        if page_hash in page_text_cache:
+                            _release_shared(shm)
+                        else:
+                            # Keep memory bounded: wait for the oldest page first
+                            if len(shared) >= SCAN_MAX_SHARED_PAGES:
+                                oldest, oldest_shm = shared.popleft()
+                                concurrent.futures.wait([oldest])
+                                _release_shared(oldest_shm)
+                            try:
+                                future = page_pool.submit(_ocr_shared_page, shm.name, shape, use_cls)
+                            except Exception as e:
+                                # Broken or shut-down pool: free the block and OCR the rest here
+                                _release_shared(shm)
+                                logger.warning(f"⚠️ OCR pool unavailable, continuing in-process: {e}")
+                                page_pool = None
+                            else:
+                                shared.append((future, shm))
+                                page_text_cache[page_hash] = future
+                    if page_pool is None or use_cls is None:
+                        img = render_page_array(page, dpi)
+                        page_hash = hashlib.blake2b(img, digest_size=16).digest()
+                        if page_hash not in page_text_cache:
+                            lines, use_cls = ocr_lines(engine, img, use_cls)
+                            page_text_cache[page_hash] = "\n".join(lines)
+                    text = page_text_cache[page_hash]
                 else:
                     text = "OCR unavailable"
             except:
                 text = ""
+            page_texts.append(text)
+        
+        for i, text in enumerate(page_texts, start=1):
+            if isinstance(text, concurrent.futures.Future):
+                try:
+                    text = "\n".join(text.result())
+                except Exception:
+                    text = ""
             
             pages_data.append({
                 "page_no": i,
@@ -234,12 +647,55 @@ def extract_scanned_pdf(pdf_path):
                 "tables": []
             })
         
-        doc.close()
-        safe_cleanup(temp_files)
         return pages_data
     except Exception as e:
         logger.error(f"❌ Scanned PDF failed: {e}")
         return []
+    finally:
+        for future, shm in shared:
+            concurrent.futures.wait([future])
+            _release_shared(shm)
+
+def extract_digital_pdf(pdf_path):
+    """Extract digital PDF"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return _extract_digital(doc, pdf_path)
+    except Exception as e:
+        logger.error(f"❌ Digital PDF failed: {e}")
+        return []
+
+def extract_scanned_pdf(pdf_path):
+    """Extract scanned PDF"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return _extract_scanned(doc)
+    except Exception as e:
+        logger.error(f"❌ Scanned PDF failed: {e}")
+        return []
+
+def extract_pdf(pdf_path, page_pool=None):
+    """Open a PDF once, detect whether it is digital and extract it"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            if _detect_digital(doc):
+                return "digital", _extract_digital(doc, pdf_path)
+            return "scanned", _extract_scanned(doc, page_pool)
+    except Exception as e:
+        logger.error(f"❌ PDF failed: {e}")
+        return "scanned", []
+
+# ---------- DOCX XML TAGS ----------
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P = W + "p"
+W_TBL = W + "tbl"
+W_TR = W + "tr"
+W_TC = W + "tc"
+W_T = W + "t"
+
+def _docx_text(element):
+    """Concatenate the w:t text runs under an element"""
+    return "".join(t.text for t in element.iter(W_T) if t.text)
 
 def extract_docx(docx_path):
     """Extract DOCX"""
@@ -249,17 +705,15 @@ def extract_docx(docx_path):
         tables_data = []
         
         for element in doc.element.body:
-            if element.tag.endswith('p'):
-                para = docx.oxml.parse_xml(docx.oxml.serialize_for_reading(element))
-                text = "".join(node.text for node in para.iter() if node.text)
-                if text.strip():
-                    text_parts.append(text.strip())
+            if element.tag == W_P:
+                text = _docx_text(element).strip()
+                if text:
+                    text_parts.append(text)
             
-            elif element.tag.endswith('tbl'):
+            elif element.tag == W_TBL:
                 table_rows = []
-                for row in element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tr'):
-                    cells = [''.join(node.text for node in cell.iter() if node.text).strip() 
-                            for cell in row.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tc')]
+                for row in element.iter(W_TR):
+                    cells = [_docx_text(cell).strip() for cell in row.iter(W_TC)]
                     if cells:
                         table_rows.append(cells)
                 if table_rows:
@@ -274,77 +728,179 @@ def extract_docx(docx_path):
         logger.error(f"❌ DOCX failed: {e}")
         return []
 
-def extract_excel(excel_path):
-    """Extract Excel"""
-    try:
-        if isinstance(excel_path, str):
-            wb = openpyxl.load_workbook(excel_path, data_only=False, read_only=True)
-        else:
-             # Handle file-like objects if necessary, though current usage ignores this
-             wb = openpyxl.load_workbook(excel_path, data_only=False, read_only=True)
-             
-        all_sheets = []
+# ---------- EXCEL NUMBER FORMATS ----------
+# Decimal precision, e.g. 0.00 or #,##0.000
+_PREC_RE = re.compile(r'\.([0#]+)')
+# Quoted text literals, e.g. 0.00 "Cr" or ""0.00" Cr" (with empty quotes)
+_LIT_RE = re.compile(r'"([^"]*)"')
+
+@functools.lru_cache(maxsize=1024)
+def _parse_fmt(fmt):
+    """Parse a number format into (precision or None, joined text literals)"""
+    if not fmt or fmt.lower() == 'general':
+        return None, ""
+    
+    precision_match = _PREC_RE.search(fmt)
+    precision = len(precision_match.group(1)) if precision_match else None
+    # Filter out empty quoted strings
+    text_literals = [t for t in _LIT_RE.findall(fmt) if t]
+    return precision, " ".join(text_literals)
+
+def _fmt_num(val, fmt):
+    """Format a numeric cell using its number format's precision and literals"""
+    precision, literals = _parse_fmt(fmt)
+    formatted_val = f"{val:.{precision}f}" if precision is not None else str(val)
+    if literals:
+        formatted_val = formatted_val + " " + literals
+    return formatted_val
+
+def _fmt_str(val, fmt):
+    """String values - preserve as-is"""
+    return val
+
+def _fmt_other(val, fmt):
+    """Other types (dates, booleans, etc.)"""
+    return str(val)
+
+_FORMATTERS = defaultdict(lambda: _fmt_other, {
+    str: _fmt_str,
+    int: _fmt_num,
+    float: _fmt_num,
+})
+
+def _iter_sheet_rows(ws):
+    """Yield formatted, non-empty rows of a worksheet"""
+    formatters = _FORMATTERS
+    for row in ws.iter_rows(values_only=False):
+        row_data = []
+        for cell in row:
+            val = cell.value
+            if val is None:
+                row_data.append("")
+                continue
+            row_data.append(formatters[type(val)](val, cell.number_format))
         
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            sheet_data = []
-            
-            # Iterate through rows
-            for row in ws.iter_rows():
-                row_data = []
-                for cell in row:
-                    val = cell.value
-                    if val is None:
-                        row_data.append("")
-                        continue
+        # Check if row has any content
+        if any(row_data):
+            yield row_data
 
-                    # Handle different value types
-                    if isinstance(val, str):
-                        # String values - preserve as-is
-                        row_data.append(val)
-                    elif isinstance(val, (int, float)):
-                        # Numeric values - check formatting
-                        fmt = cell.number_format
-                        formatted_val = str(val)
-                        
-                        # Check if format is not General and has relevant chars
-                        if fmt and fmt.lower() != 'general':
-                            import re
-                            
-                            # Detect decimal precision from format string
-                            precision_match = re.search(r'\.([0#]+)', fmt)
-                            
-                            # Extract text literals (e.g., "Cr", "Dr") from format
-                            # Format strings can have quoted text like:
-                            # - 0.00 "Cr"
-                            # - ""0.00" Cr" (with empty quotes)
-                            # Find all quoted strings, filter out empty ones
-                            all_quotes = re.findall(r'"([^"]*)"', fmt)
-                            text_literals = [t for t in all_quotes if t]  # Remove empty strings
-                            
-                            if precision_match:
-                                precision = len(precision_match.group(1))
-                                # Format with fixed precision
-                                formatted_val = f"{val:.{precision}f}"
-                            
-                            # Append text literals if found
-                            if text_literals:
-                                # Join all text literals with space
-                                formatted_val = formatted_val + " " + " ".join(text_literals)
-                        
-                        row_data.append(formatted_val)
-                    else:
-                        # Handle other types (dates, booleans, etc.)
-                        row_data.append(str(val))
-                
-                # Check if row has any content
+# ---------- EXCEL READERS ----------
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+def _xlsx_uses_number_formats(excel_path):
+    """
+    Check whether any cell style's number format would change our output
+    (decimal precision or text literals). calamine doesn't expose number
+    formats, so those workbooks need openpyxl.
+    """
+    if Path(excel_path).suffix.lower() != ".xlsx":
+        # Legacy .xls is only readable by calamine
+        return False
+    try:
+        with zipfile.ZipFile(excel_path) as z:
+            styles = ET.fromstring(z.read("xl/styles.xml"))
+    except KeyError:
+        # No styles part: everything is General
+        return False
+    except Exception:
+        return True
+    
+    custom_formats = {
+        int(fmt.get("numFmtId")): fmt.get("formatCode")
+        for fmt in styles.iter(XLSX_NS + "numFmt")
+    }
+    cell_xfs = styles.find(XLSX_NS + "cellXfs")
+    for xf in (cell_xfs if cell_xfs is not None else []):
+        fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom_formats.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+        if fmt is None or _parse_fmt(fmt) != (None, ""):
+            return True
+    return False
+
+# A formula element (<f>, <f t="shared" .../>) in a worksheet part
+_XLSX_FORMULA_RE = re.compile(rb"<(?:\w+:)?f[\s/>]")
+XLSX_SCAN_CHUNK = 1 << 20
+
+def _xlsx_has_formulas(excel_path):
+    """
+    Check whether any worksheet contains formulas. openpyxl returns the
+    formula text while calamine returns the cached value, so those
+    workbooks stay on openpyxl to keep the output unchanged.
+    """
+    if Path(excel_path).suffix.lower() != ".xlsx":
+        return False
+    try:
+        with zipfile.ZipFile(excel_path) as z:
+            for name in z.namelist():
+                if not (name.startswith("xl/worksheets/") and name.endswith(".xml")):
+                    continue
+                with z.open(name) as sheet:
+                    tail = b""
+                    while chunk := sheet.read(XLSX_SCAN_CHUNK):
+                        # Keep a few bytes so a tag split across chunks is still seen
+                        if _XLSX_FORMULA_RE.search(tail + chunk):
+                            return True
+                        tail = chunk[-8:]
+    except Exception:
+        return True
+    return False
+
+# Whole floats at or above this are written with an exponent (str(1e16) == '1e+16')
+CALAMINE_INT_LIMIT = 1e16
+
+def _calamine_cell(val):
+    """Render a calamine value the way openpyxl with a General format would"""
+    if type(val) is str:
+        return val
+    if type(val) is float and val.is_integer() and abs(val) < CALAMINE_INT_LIMIT:
+        # openpyxl reads whole numbers as int, but only when the stored text has
+        # no exponent; from 1e16 on it is stored (and read) in float notation
+        val = int(val)
+    elif type(val) is datetime.date:
+        # openpyxl reads date cells as datetime
+        val = datetime.datetime.combine(val, datetime.time())
+    return str(val)
+
+def _read_sheets_calamine(excel_path):
+    """Read all non-empty sheets with calamine"""
+    wb = CalamineWorkbook.from_path(excel_path)
+    all_sheets = []
+    try:
+        for sheet_name in wb.sheet_names:
+            # Keep leading empty rows/columns so cells line up like openpyxl
+            rows = wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+            sheet_data = []
+            for row in rows:
+                row_data = [_calamine_cell(val) for val in row]
                 if any(row_data):
                     sheet_data.append(row_data)
+            if sheet_data:
+                all_sheets.append(sheet_data)
+    finally:
+        wb.close()
+    return all_sheets
 
+def _read_sheets_openpyxl(excel_path):
+    """Read all non-empty sheets with openpyxl, applying number formats"""
+    wb = openpyxl.load_workbook(excel_path, data_only=False, read_only=True)
+    all_sheets = []
+    try:
+        for sheet_name in wb.sheetnames:
+            sheet_data = list(_iter_sheet_rows(wb[sheet_name]))
             if sheet_data:
                 all_sheets.append(sheet_data)
-        
+    finally:
         wb.close()
+    return all_sheets
+
+def extract_excel(excel_path):
+    """Extract Excel"""
+    try:
+        if (CalamineWorkbook is not None and not _xlsx_uses_number_formats(excel_path)
+                and not _xlsx_has_formulas(excel_path)):
+            all_sheets = _read_sheets_calamine(excel_path)
+        else:
+            all_sheets = _read_sheets_openpyxl(excel_path)
         
         return [{
             "page_no": 1,
@@ -358,11 +914,11 @@ def extract_excel(excel_path):
 def extract_image(image_path):
     """Extract image"""
     try:
-        if not ocr_engine:
+        engine = init_ocr_engine()
+        if not engine:
             return [{"page_no": 1, "text": "OCR unavailable", "tables": []}]
         
-        ocr_result = ocr_engine.ocr(image_path, cls=True)
-        lines = [line[1][0] for line in ocr_result[0]] if ocr_result and ocr_result[0] else []
+        lines, _ = ocr_lines(engine, image_path)
         
         return [{
             "page_no": 1,
@@ -382,14 +938,13 @@ def get_file_type(file_path):
     elif ext in [".png", ".jpg", ".jpeg", ".bmp", ".tiff"]: return "image"
     return "unknown"
 
-def extract_document(file_path):
-    """Main extraction function"""
+def extract_document(file_path, page_pool=None):
+    """Main extraction function (page_pool: optional process pool for scanned PDF pages)"""
     file_type = get_file_type(file_path)
     file_name = os.path.basename(file_path)
     
     if file_type == "pdf":
-        pdf_type = "digital" if is_digital_pdf(file_path) else "scanned"
-        pages = extract_digital_pdf(file_path) if pdf_type == "digital" else extract_scanned_pdf(file_path)
+        pdf_type, pages = extract_pdf(file_path, page_pool)
         return {
             "file_name": file_name,
             "pdf_type": pdf_type,
@@ -413,8 +968,9 @@ def extract_document(file_path):
 
 def process_zip(zip_path, output_file="extracted_data.json"):
     """Process zip file"""
+    out_dir = make_scratch_dir()
     try:
-        files = extract_zip(zip_path)
+        files = extract_zip(zip_path, out_dir)
         if not files:
             logger.error("❌ No supported files")
             return
@@ -422,14 +978,14 @@ def process_zip(zip_path, output_file="extracted_data.json"):
         logger.info(f"🔍 Found {len(files)} files")
         
         output = []
-        for i, file_path in enumerate(files, 1):
-            logger.info(f"[{i}/{len(files)}] {os.path.basename(file_path)}")
-            result = extract_document(file_path)
-            if result:
-                output.append(result)
+        with create_extraction_pool() as ex:
+            for i, (file_path, result) in enumerate(zip(files, ex.map(extract_document, files)), 1):
+                logger.info(f"[{i}/{len(files)}] {os.path.basename(file_path)}")
+                if result:
+                    output.append(result)
         
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+        with open(output_file, "wb") as f:
+            f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
         
         logger.info(f"\n✅ SUCCESS!")
         logger.info(f"📄 {output_file}")
@@ -439,15 +995,19 @@ def process_zip(zip_path, output_file="extracted_data.json"):
     except Exception as e:
         logger.error(f"❌ Failed: {e}")
         return None
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
 
 def process_single_file(file_path, output_file="extracted_data.json"):
     """Process single file"""
     try:
         logger.info(f"Processing: {os.path.basename(file_path)}")
-        result = extract_document(file_path)
+        # Scanned PDF pages are OCR'd across the pool
+        with create_extraction_pool() as page_pool:
+            result = extract_document(file_path, page_pool)
         if result:
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump([result], f, indent=2, ensure_ascii=False)
+            with open(output_file, "wb") as f:
+                f.write(orjson.dumps([result], option=orjson.OPT_INDENT_2))
             logger.info(f"✅ {output_file}")
             return [result]
         return None
@@ -0,0 +1,33 @@
+import shutil
+from types import SimpleNamespace
+
+import fitz
+import pandas as pd
+
+import tds_challan_extractor as tce
+
+
+def test_camelot_results_are_cached_by_content(tmp_path, monkeypatch):
+    first = tmp_path / "upload1.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Challan")
+    doc.save(first)
+    second = tmp_path / "upload2.pdf"
+    shutil.copy(first, second)
+
+    calls = []
+
+    def read_pdf(path, pages, flavor, **kwargs):
+        calls.append((path, flavor, pages))
+        return [SimpleNamespace(page="1", df=pd.DataFrame([["Section", "Amount"], ["194C", "1250.00"]]))]
+
+    monkeypatch.setattr(tce.camelot, "read_pdf", read_pdf)
+    monkeypatch.setattr(tce, "_camelot_cache", tce.OrderedDict())
+
+    tables = tce.camelot_tables_by_page(str(first), [1])
+    assert tables[1] == [[["Section", "Amount"], ["194C", "1250.00"]]]
+    tables[1][0][0][0] = "changed"
+
+    # Same bytes under another temp path: served from the cache, unchanged
+    assert tce.camelot_tables_by_page(str(second), [1])[1] == [[["Section", "Amount"], ["194C", "1250.00"]]]
+    assert calls == [(str(first), "lattice", "1")]
@@ -0,0 +1,16 @@
+import openpyxl
+import pytest
+
+from tds_challan_extractor import _read_sheets_calamine, _read_sheets_openpyxl
+
+pytest.importorskip("python_calamine")
+
+
+def test_calamine_matches_openpyxl_for_large_numbers(tmp_path):
+    path = tmp_path / "numbers.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Amount", 42.0, 7, 2.5, 1e15, 9999999999999998.0])
+    wb.active.append(["Large", 1e16, 1e20, 123456789012345678.0, -3e17, -1e16])
+    wb.save(path)
+
+    assert _read_sheets_calamine(str(path)) == _read_sheets_openpyxl(str(path))
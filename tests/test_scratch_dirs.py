@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import time
+
+import tds_challan_extractor as tce
+
+
+def test_sweep_keeps_dirs_of_running_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(tce, "SCRATCH_DIR", str(tmp_path))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    own = tce.make_scratch_dir()
+    other = tmp_path / f"smartaudit_{os.getppid()}_busy"
+    orphan = tmp_path / f"smartaudit_{exited.pid}_orphan"
+    unowned_old = tmp_path / "smartaudit_legacy"
+    unowned_new = tmp_path / "smartaudit_recent"
+    for path in (other, orphan, unowned_old, unowned_new):
+        path.mkdir()
+    old = time.time() - 2 * tce.SCRATCH_MAX_AGE
+    for path in (own, other, unowned_old):
+        os.utime(path, (old, old))
+
+    assert tce.sweep_scratch_dirs() == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [os.path.basename(own), other.name, unowned_new.name]
+    )
@@ -0,0 +1,24 @@
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+from tds_challan_extractor import _attach_shared, _release_shared
+
+
+def test_attach_does_not_register_with_resource_tracker(monkeypatch):
+    owner = shared_memory.SharedMemory(create=True, size=16)
+    owner.buf[:4] = b"page"
+    registered = []
+    monkeypatch.setattr(resource_tracker, "register", lambda name, rtype: registered.append(name))
+    try:
+        shm = _attach_shared(owner.name)
+        try:
+            assert bytes(shm.buf[:4]) == b"page"
+        finally:
+            shm.close()
+        assert registered == []
+        if sys.version_info < (3, 13):
+            # The stub is only installed for the duration of the attach
+            resource_tracker.register("probe", "shared_memory")
+            assert registered == ["probe"]
+    finally:
+        _release_shared(owner)
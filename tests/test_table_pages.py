@@ -0,0 +1,56 @@
+import fitz
+
+from tds_challan_extractor import find_table_pages
+
+PROSE = (
+    "The deductor shall furnish the statement of tax deducted at source within "
+    "the time prescribed, and any challan deposited after the due date attracts "
+    "interest for each month or part of a month of delay. Where the deductee "
+    "does not furnish a permanent account number, tax is deducted at the higher "
+    "rate specified for such cases. "
+) * 6
+
+
+def _prose_pages(doc):
+    """Paragraphs, justified paragraphs, a numbered list and short filler lines"""
+    doc.new_page().insert_textbox(fitz.Rect(72, 72, 523, 770), PROSE, fontsize=11)
+    doc.new_page().insert_textbox(fitz.Rect(72, 72, 523, 770), PROSE, fontsize=10, align=3)
+
+    page = doc.new_page()
+    for i in range(1, 9):
+        page.insert_text((72, 80 + 20 * i), f"{i}.")
+        page.insert_text((90, 80 + 20 * i), f"Item number {i} of the checklist for quarterly returns")
+
+    page = doc.new_page()
+    page.insert_text((72, 72), "Summary of Deductions", fontsize=16)
+    for i in range(12):
+        page.insert_text((72, 110 + 18 * i), "Filler line for the remarks section " * (1 + i % 2))
+
+
+def _table_page(doc):
+    """Unruled table: aligned columns, no drawn lines"""
+    page = doc.new_page()
+    page.insert_text((72, 72), "Challan details", fontsize=14)
+    columns = (72, 180, 300, 430)
+    rows = [("Section", "Challan No", "Date", "Amount")] + [
+        ("194C", f"0051{i}", f"0{i}-04-2024", f"{i * 1250}.00") for i in range(1, 7)
+    ]
+    for r, row in enumerate(rows):
+        for x, cell in zip(columns, row):
+            page.insert_text((x, 110 + 18 * r), cell)
+
+
+def test_prose_pages_are_not_stream_candidates():
+    doc = fitz.open()
+    _prose_pages(doc)
+    lattice_pages, stream_pages = find_table_pages(doc)
+    assert lattice_pages == []
+    assert stream_pages == []
+
+
+def test_aligned_columns_are_stream_candidates():
+    doc = fitz.open()
+    _prose_pages(doc)
+    _table_page(doc)
+    _, stream_pages = find_table_pages(doc)
+    assert stream_pages == [doc.page_count]